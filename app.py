@@ -1,9 +1,53 @@
-from fastapi import FastAPI, Request
+import queue
+import asyncio
+import logging
+import anyio.to_thread
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+from fastapi import BackgroundTasks, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel, EmailStr
 from main import run_pipeline
+from parse_documents import close_async_clients
+from supabase_insert import insert_candidate_to_supabase
 
-app = FastAPI()
+__all__ = ["app"]
+
+logger = logging.getLogger(__name__)
+
+# Threads available for blocking work (PDF parsing, Supabase writes)
+THREAD_POOL_SIZE = 64
+
+def _start_queue_logging() -> QueueListener:
+    """Move the root log handlers behind a queue so stream writes happen off the event loop."""
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    log_queue = queue.SimpleQueue()
+    root.handlers = [QueueHandler(log_queue)]
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # asyncio.to_thread uses the loop's default executor; anyio's limiter covers
+    # Starlette's threadpool. Size both so PDF parsing doesn't starve other requests
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    
+    listener = _start_queue_logging()
+    try:
+        yield
+    finally:
+        await close_async_clients()
+        listener.stop()
+        logging.getLogger().handlers = list(listener.handlers)
+
+app = FastAPI(lifespan=lifespan)
 
 # ✅ Allow all CORS origins (you can later restrict to Lovable URL)
 app.add_middleware(
@@ -14,25 +58,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class CandidatePayload(BaseModel):
+    """Request body for /api/process_candidate (validated by pydantic-core)."""
+    name: str
+    email: EmailStr
+    cv_url: str  # Storage URL or local path to the CV PDF
+    dice_url: str  # Storage URL or local path to the DICE PDF
+
+class CandidateResult(BaseModel):
+    """Response body for /api/process_candidate; FastAPI serializes it straight to JSON bytes via pydantic-core."""
+    status: str
+    summary_notes: Any  # Written by the model; normally a string
+    answers: Dict[str, Any]
+
 @app.get("/")
-def read_root():
+def read_root() -> Dict[str, str]:
     return {"status": "ok", "message": "Anu backend is live"}
 
-@app.post("/api/process_candidate")
-async def process_candidate(request: Request):
+@app.post("/api/process_candidate", response_model=CandidateResult)
+async def process_candidate(payload: CandidatePayload, background_tasks: BackgroundTasks):
     try:
-        body = await request.json()
-        print("📥 Received:", body)
-
-        result = run_pipeline(
-            name=body["name"],
-            email=body["email"],
-            cv_url=body["cv_url"],
-            dice_url=body["dice_url"],
-            push_supabase=True,
+        logger.info("📥 Received candidate: %s", payload.name, extra={"candidate": payload.name})
+
+        result = await run_pipeline(
+            name=payload.name,
+            email=payload.email,
+            cv_url=payload.cv_url,
+            dice_url=payload.dice_url,
+            push_supabase=False,
             return_json=True
         )
 
+        if result.get("status") != "success":
+            return JSONResponse(status_code=500, content={"status": "error", "message": result.get("error", "")})
+
+        # The client doesn't need the insert confirmation, so write to Supabase
+        # after the response has been sent
+        background_tasks.add_task(
+            insert_candidate_to_supabase,
+            profile_data=result["profile"],
+            chat_data=result["interview"],
+            cv_url=payload.cv_url,
+            dice_url=payload.dice_url
+        )
+
         return {
             "status": "success",
             "summary_notes": result.get("summary_notes", ""),
@@ -40,5 +109,19 @@ async def process_candidate(request: Request):
         }
 
     except Exception as e:
-        print("❌ ERROR:", str(e))
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)}) 
\ No newline at end of file
+        logger.exception("❌ Error processing candidate %s: %s", payload.name, e)
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    # Outbound OpenAI/Supabase I/O dominates, so run several workers on uvloop
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", 2 * (os.cpu_count() or 1) + 1)),
+        loop="uvloop",
+        http="httptools"
+    )
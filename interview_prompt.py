@@ -39,60 +39,46 @@ Anu should:
 - Use emojis occasionally (e.g. "🚀", "💡", "👏")
 """
 
-import json
+import os
+import copy
+import string
+import functools
+import orjson
 import openai
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
-logger = logging.getLogger(__name__)
-
-def generate_interview_chat(profile_data: Dict, api_key: Optional[str] = None) -> Dict:
-    """Generate a conversational, mentor-style interview with Anu."""
-    
-    # Set up OpenAI client
-    if api_key:
-        client = openai.OpenAI(api_key=api_key)
-    else:
-        client = openai.OpenAI()
-    
-    # Extract key information
-    name = profile_data.get('name', 'Candidate')
-    personality_type = profile_data.get('personality_type', 'Unknown')
-    tone_profile = profile_data.get('tone_profile', 'warm and curious')
-    skills = profile_data.get('skills', [])
-    cad_tools = profile_data.get('cad_tools', [])
-    projects = profile_data.get('projects', [])
-    
-    # System primer for the new conversational Anu
-    system_msg = f"""
-You are Anu, an AI recruiter with a warm, mentor-like tone. You are smart, emotionally intelligent, and deeply curious about people. Your tone is: {tone_profile}
+from parse_documents import (
+    PROFILE_SYSTEM_MSG,
+    build_profile_prompt,
+    extract_candidate_profile,
+    get_async_client,
+    profile_cache_key,
+    run_async,
+    validate_profile,
+    _get_default_profile,
+)
+from supabase_insert import cache_profile, get_cached_profile
 
-Your goal is to interview a candidate conversationally. Ask one question at a time. React to their answer with genuine interest and encouragement. Then ask them to share a story, example, or what they learned from that experience.
-
-Build a memory of each exchange as a 1-line takeaway about their personality, work style, or values. At the end, use the answers + memories to write a 3-line summary of the candidate's strengths, mindset, and culture fit.
-
-Key questions to cover (but ask them naturally in conversation):
-- Where are they based?
-- Education/graduation status
-- Tell me about their projects (ask for specific stories)
-- CAD tools they enjoy using
-- Preference for hands-on vs design-only work
-- Openness to relocating to Umargam
-- Commitment to 2-3 years
-- Salary expectations
-- Interest in factory visit
+logger = logging.getLogger(__name__)
 
-Use emojis occasionally to keep it warm and engaging. Be genuinely curious about their experiences and what drives them.
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
 
-Respond in JSON format:
-{{
+# Worked example appended to the system prompt only when debugging prompt output
+FEW_SHOT_EXAMPLE = """
+Example:
+{
   "chat_log": [
-    {{"role": "Anu", "message": "Hi {name}! So happy to chat with you today! Where are you currently based?"}},
-    {{"role": "Candidate", "message": "I'm in Bengaluru."}},
-    {{"role": "Anu", "message": "Love that city! 💫 What do you enjoy most about living there?"}}
+    {"role": "Anu", "message": "Hi {name}! So happy to chat with you today! Where are you currently based?"},
+    {"role": "Candidate", "message": "I'm in Bengaluru."},
+    {"role": "Anu", "message": "Love that city! 💫 What do you enjoy most about living there?"}
   ],
-  "answers": {{
+  "answers": {
     "location": "Bengaluru",
     "education_status": "Recently graduated",
     "internship_work": "Worked on drone projects",
@@ -102,69 +88,304 @@ Respond in JSON format:
     "commitment": "Willing for 2-3 years",
     "salary_expectation": "Within budget",
     "factory_visit_interest": "Very interested"
-  }},
+  },
   "memories": [
     "Kishore enjoys hands-on roles and feels most fulfilled when seeing his designs in action.",
     "He took initiative during his internship to integrate ML models without being asked."
   ],
   "summary_notes": "Kishore is a thoughtful, technically sharp candidate who thrives in hands-on environments. He takes initiative and has strong interdisciplinary thinking. Great culture fit for small team learning environments."
-}}
+}
 """
 
-    user_msg = f"""
+# Transient OpenAI failures are retried with jittered exponential backoff before
+# falling back to the default interview
+openai_retry = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_random_exponential(multiplier=1, max=10),
+    retry=retry_if_exception_type((openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)),
+    reraise=True
+)
+
+# Process-local LRU of generated interviews keyed by profile fingerprint
+INTERVIEW_CACHE_SIZE = 1024
+_interview_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+def profile_fingerprint(profile_data: Dict) -> str:
+    """Hash the profile fields that shape the interview prompt."""
+    # The model may return null or non-string items for list fields
+    key = [
+        profile_data.get('name', 'Candidate'),
+        profile_data.get('personality_type', 'Unknown'),
+        profile_data.get('tone_profile', 'warm and curious'),
+        sorted(map(str, profile_data.get('skills') or [])),
+        sorted(map(str, profile_data.get('cad_tools') or [])),
+        sorted(map(str, profile_data.get('projects') or []))
+    ]
+    return hashlib.blake2b(orjson.dumps(key), digest_size=16).hexdigest()
+
+def get_cached_interview(profile_data: Dict) -> Optional[Dict]:
+    """Return a copy of a previously generated interview for this profile, if any."""
+    fingerprint = profile_fingerprint(profile_data)
+    cached = _interview_cache.get(fingerprint)
+    if cached is None:
+        return None
+    
+    _interview_cache.move_to_end(fingerprint)
+    return copy.deepcopy(cached)
+
+def cache_interview(profile_data: Dict, interview_data: Dict):
+    """Remember a successfully generated interview (fallback data is never cached)."""
+    if "error" in interview_data.get("metadata", {}):
+        return
+    
+    _interview_cache[profile_fingerprint(profile_data)] = copy.deepcopy(interview_data)
+    if len(_interview_cache) > INTERVIEW_CACHE_SIZE:
+        _interview_cache.popitem(last=False)
+
+# System primer for the new conversational Anu. JSON mode enforces the
+# structure, so only a terse schema is sent unless debugging
+SYSTEM_TEMPLATE = string.Template("""
+You are Anu, a warm, mentor-like AI recruiter: emotionally intelligent and deeply curious about people. Your tone is: $tone_profile
+
+Interview $name conversationally, one question at a time. React to each answer with genuine interest, then ask for a story, example, or lesson behind it. Use emojis occasionally.
+
+Cover naturally: location, education/graduation status, projects (with stories), favourite CAD tools, hands-on vs design-only preference, relocating to Umargam, 2-3 year commitment, salary expectations, interest in a factory visit.
+
+Respond with a JSON object:
+{"chat_log": [{"role": "Anu"|"Candidate", "message": str}], "answers": {"location", "education_status", "internship_work", "cad_tools", "role_preference", "relocation", "commitment", "salary_expectation", "factory_visit_interest"}: str, "memories": [1-line takeaways about personality, work style or values], "summary_notes": "3-line summary of strengths, mindset and culture fit"}
+""")
+
+USER_TEMPLATE = string.Template("""
 Here's the candidate profile:
 
-Name: {name}
-Personality Type: {personality_type}
-Skills: {', '.join(skills)}
-CAD Tools: {', '.join(cad_tools)}
-Projects: {', '.join(projects)}
+Name: $name
+Personality Type: $personality_type
+Skills: $skills
+CAD Tools: $cad_tools
+Projects: $projects
 
 Begin the interview now. Make it feel like a natural conversation between two people getting to know each other.
-"""
+""")
+
+@functools.lru_cache(maxsize=256)
+def _render_system(tone_profile: str, name: str, debug: bool = False) -> str:
+    """Render the system primer; most candidates share a handful of tones, so cache it."""
+    system_msg = SYSTEM_TEMPLATE.substitute(tone_profile=tone_profile, name=name)
+    if debug:
+        system_msg += FEW_SHOT_EXAMPLE.replace("{name}", name)
+    return system_msg
+
+def build_interview_request(profile_data: Dict, model: Optional[str] = None, debug: bool = False) -> Dict:
+    """
+    Build the chat-completion request body for an Anu interview.
+    
+    Shared by the live streaming path and the Batch API path so both send
+    identical prompts.
+    
+    Args:
+        profile_data: Extracted candidate profile
+        model: Chat model (defaults to ANU_CHAT_MODEL or gpt-4o-mini)
+        debug: Include the full worked example in the system prompt
+    
+    Returns:
+        Keyword arguments for client.chat.completions.create
+    """
+    # Allow per-deploy overrides via ANU_CHAT_MODEL
+    model = model or os.getenv("ANU_CHAT_MODEL", DEFAULT_CHAT_MODEL)
+    
+    # Extract key information
+    name = profile_data.get('name', 'Candidate')
+    personality_type = profile_data.get('personality_type', 'Unknown')
+    tone_profile = profile_data.get('tone_profile', 'warm and curious')
+    skills = map(str, profile_data.get('skills') or [])
+    cad_tools = map(str, profile_data.get('cad_tools') or [])
+    projects = map(str, profile_data.get('projects') or [])
+    
+    system_msg = _render_system(tone_profile, name, debug)
+    user_msg = USER_TEMPLATE.substitute(
+        name=name,
+        personality_type=personality_type,
+        skills=', '.join(skills),
+        cad_tools=', '.join(cad_tools),
+        projects=', '.join(projects)
+    )
 
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg}
+        ],
+        "temperature": 0.5,  # Natural conversation without drifting into malformed JSON
+        "max_tokens": 1200,  # Bound output size and latency
+        "stop": ["\n\n\n"],
+        "response_format": {"type": "json_object"}
+    }
+
+def parse_interview_response(chat_data: str, profile_data: Dict) -> Dict:
+    """Parse raw model output into interview data, falling back to defaults on bad JSON."""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg}
-            ],
-            temperature=0.8  # Higher temperature for more natural conversation
-        )
-
-        chat_data = response.choices[0].message.content.strip()
-        
-        try:
-            parsed_data = json.loads(chat_data)
-            
-            # Add metadata
-            parsed_data['metadata'] = {
-                'generated_at': datetime.now().isoformat(),
-                'candidate_name': name,
-                'personality_type': personality_type,
-                'tone_profile': tone_profile,
-                'version': 'Anu v2 - Conversational Mentor'
-            }
-            
-            # Validate and ensure all required fields exist
-            if 'memories' not in parsed_data:
-                parsed_data['memories'] = []
-            if 'answers' not in parsed_data:
-                parsed_data['answers'] = {}
-            if 'summary_notes' not in parsed_data:
-                parsed_data['summary_notes'] = f"Interview completed for {name}. Manual review recommended."
-            
-            return parsed_data
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse interview JSON: {e}")
-            return _get_default_interview_data(profile_data)
+        parsed_data = orjson.loads(chat_data)
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Failed to parse interview JSON: {e}")
+        return _get_default_interview_data(profile_data)
+    
+    return finalize_interview_data(parsed_data, profile_data)
+
+def finalize_interview_data(parsed_data: Dict, profile_data: Dict) -> Dict:
+    """Attach metadata and fill in any missing interview fields."""
+    name = profile_data.get('name', 'Candidate')
+    
+    # Add metadata
+    parsed_data['metadata'] = {
+        'generated_at': datetime.now().isoformat(),
+        'candidate_name': name,
+        'personality_type': profile_data.get('personality_type', 'Unknown'),
+        'tone_profile': profile_data.get('tone_profile', 'warm and curious'),
+        'version': 'Anu v2 - Conversational Mentor'
+    }
+    
+    # Validate and ensure all required fields exist
+    if 'memories' not in parsed_data:
+        parsed_data['memories'] = []
+    if 'answers' not in parsed_data:
+        parsed_data['answers'] = {}
+    if 'summary_notes' not in parsed_data:
+        parsed_data['summary_notes'] = f"Interview completed for {name}. Manual review recommended."
+    
+    return parsed_data
+
+async def generate_interview_chat(profile_data: Dict, api_key: Optional[str] = None, model: Optional[str] = None, debug: bool = False) -> Dict:
+    """Generate a conversational, mentor-style interview with Anu."""
+    
+    # Re-uploads and retries of the same profile skip the OpenAI round-trip
+    cached = get_cached_interview(profile_data)
+    if cached is not None:
+        logger.info(f"Using cached interview for: {profile_data.get('name', 'Candidate')}")
+        return cached
+    
+    # Reuse the shared pooled client for this key
+    client = get_async_client(api_key)
+    
+    request = build_interview_request(profile_data, model, debug)
+
+    try:
+        chat_data = await _stream_completion(client, request)
+        interview_data = parse_interview_response(chat_data, profile_data)
+        cache_interview(profile_data, interview_data)
+        return interview_data
             
     except Exception as e:
         logger.error(f"Error generating interview: {e}")
         return _get_default_interview_data(profile_data)
 
+FUSED_RESPONSE_INSTRUCTIONS = """
+Then, in the same response, run the Anu interview described in the system message for this candidate, using the name and tone_profile you extracted.
+
+Respond with a single JSON object: {"profile": {<the profile fields above>}, "interview": {<the interview object>}}
+"""
+
+# Output budget reserved for the profile object on top of the interview's own
+PROFILE_MAX_TOKENS = 500
+
+async def generate_profile_and_interview(cv_text: str, dice_text: str, name: str = "", email: str = "", api_key: Optional[str] = None, model: Optional[str] = None) -> Tuple[Dict, Dict]:
+    """
+    Extract the candidate profile and generate the interview in a single OpenAI call.
+    
+    Used by the API pipeline to share the CV/DICE context prefill and save a full
+    round-trip; the separate extract_candidate_profile / generate_interview_chat
+    functions remain for the batch and CLI paths. If the combined response is
+    truncated or incomplete, whichever half is missing is produced by its own call.
+    Documents already in the profile cache skip the fused call; their interview
+    then comes from generate_interview_chat and its cache.
+    
+    Args:
+        cv_text: Raw text extracted from CV PDF
+        dice_text: Raw text extracted from DICE test PDF
+        name: Candidate name from the request; used when the CV doesn't yield one
+        email: Candidate email from the request; used when the CV doesn't yield one
+        api_key: OpenAI API key (optional, can be set via environment)
+        model: Chat model (defaults to ANU_CHAT_MODEL or gpt-4o-mini)
+    
+    Returns:
+        Tuple of (profile_data, interview_data)
+    """
+    seed = {key: value for key, value in (("name", name), ("email", email)) if value}
+    
+    cache_key = profile_cache_key(cv_text, dice_text)
+    cached = await asyncio.to_thread(get_cached_profile, cache_key)
+    if cached is not None:
+        profile_data = {**_get_default_profile(), **seed, **{key: value for key, value in cached.items() if value}}
+        return profile_data, await generate_interview_chat(profile_data, api_key=api_key, model=model)
+    
+    client = get_async_client(api_key)
+    
+    # The interview primer is rendered with fixed placeholders so the system
+    # message and static instructions are identical for every candidate; the
+    # request's name goes in the variable tail after the documents
+    interview_request = build_interview_request(
+        {"name": "the candidate", "tone_profile": "the tone_profile you extract for the candidate"},
+        model
+    )
+    user_msg = build_profile_prompt(cv_text, dice_text, FUSED_RESPONSE_INSTRUCTIONS)
+    if name:
+        user_msg += f"\nNAME GIVEN ON THE APPLICATION: {name}\n"
+    request = {
+        **interview_request,
+        "messages": [
+            {"role": "system", "content": PROFILE_SYSTEM_MSG + "\n" + interview_request["messages"][0]["content"]},
+            {"role": "user", "content": user_msg}
+        ],
+        # The interview keeps its full budget; a blank-line stop would cut the
+        # combined object short
+        "max_tokens": interview_request["max_tokens"] + PROFILE_MAX_TOKENS
+    }
+    request.pop("stop", None)
+    
+    try:
+        combined = orjson.loads(await _stream_completion(client, request))
+    except Exception as e:
+        logger.error(f"Error generating profile and interview: {e}")
+        combined = None
+    
+    if not isinstance(combined, dict):
+        combined = {}
+    
+    profile = combined.get("profile")
+    if isinstance(profile, dict):
+        # Only complete profiles are cached, as in _complete_profile
+        if validate_profile(profile):
+            await asyncio.to_thread(cache_profile, cache_key, profile)
+    else:
+        logger.warning("Combined response did not include a profile object; extracting it separately")
+        profile = await asyncio.to_thread(extract_candidate_profile, cv_text, dice_text, api_key)
+    
+    # Extracted values win; the request's name/email fill whatever the CV lacked
+    profile_data = {**_get_default_profile(), **seed, **{key: value for key, value in profile.items() if value}}
+    logger.info(f"Successfully extracted profile for: {profile_data.get('name') or 'Unknown'}")
+    
+    interview = combined.get("interview")
+    if not isinstance(interview, dict):
+        logger.warning("Combined response did not include an interview object; generating it separately")
+        return profile_data, await generate_interview_chat(profile_data, api_key=api_key, model=model)
+    
+    interview_data = finalize_interview_data(interview, profile_data)
+    cache_interview(profile_data, interview_data)
+    return profile_data, interview_data
+
+@openai_retry
+async def _stream_completion(client: openai.AsyncOpenAI, request: Dict) -> str:
+    """Stream a chat completion and return the concatenated content."""
+    response = await client.chat.completions.create(**request, stream=True)
+
+    # Collect token deltas as they arrive and parse once the stream completes
+    parts: List[str] = []
+    async for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+
+    return "".join(parts).strip()
+
 def _get_default_interview_data(profile_data: Dict) -> Dict:
     """Return default interview structure when generation fails."""
     name = profile_data.get('name', 'Candidate')
@@ -207,16 +428,21 @@ def validate_interview_data(interview_data: Dict) -> bool:
     
     return True
 
-def format_chat_for_display(chat_data: Dict) -> str:
-    """Format the chat log for easy reading."""
+def format_chat_for_display(chat_data: Dict, max_chars: Optional[int] = None) -> str:
+    """Format the chat log for easy reading, stopping early once max_chars is exceeded."""
     if "chat_log" not in chat_data:
         return "No chat log available"
     
     formatted_chat = []
+    length = -2  # The first message has no preceding separator
     for message in chat_data["chat_log"]:
         role = message.get("role", "Unknown")
         content = message.get("message", "")
         formatted_chat.append(f"{role}: {content}")
+        
+        length += len(formatted_chat[-1]) + 2
+        if max_chars is not None and length > max_chars:
+            return "\n\n".join(formatted_chat)[:max_chars] + "..."
     
     return "\n\n".join(formatted_chat)
 
@@ -250,7 +476,7 @@ if __name__ == "__main__":
     print("🧪 Testing Anu v2 - Conversational Mentor...")
     
     try:
-        result = generate_interview_chat(sample_profile)
+        result = run_async(generate_interview_chat(sample_profile))
         print("✅ Interview generated successfully!")
         print(f"Summary: {result.get('summary_notes', 'No summary')}")
         print(f"Memories: {len(result.get('memories', []))} captured")
@@ -5,15 +5,42 @@ Handles the complete workflow from PDF extraction to profile generation
 
 import os
 import json
+import asyncio
 import logging
+import tempfile
+import httpx
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, BinaryIO
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
-from parse_documents import extract_candidate_profile, validate_profile
+from parse_documents import (
+    extract_candidate_profile,
+    extract_candidate_profile_streaming,
+    validate_profile,
+    run_async,
+    submit_batch_requests,
+    poll_batch,
+)
 from pdf_extractor import extract_cv_and_dice_texts, extract_text_from_pdf
-from interview_prompt import generate_interview_chat, validate_interview_data, format_chat_for_display
-from supabase_insert import insert_candidate_to_supabase
+from interview_prompt import (
+    generate_interview_chat,
+    generate_profile_and_interview,
+    build_interview_request,
+    parse_interview_response,
+    validate_interview_data,
+    format_chat_for_display,
+    _get_default_interview_data,
+)
+from supabase_insert import (
+    build_candidate_record,
+    get_supabase_credentials,
+    insert_candidate_to_supabase,
+    insert_candidates_bulk,
+    insert_processing_placeholder,
+    update_candidate_in_supabase,
+)
 
 # Load environment variables
 load_dotenv()
@@ -25,7 +52,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_pipeline(name: str, email: str, cv_url: str, dice_url: str, push_supabase: bool = True, return_json: bool = False) -> Dict[str, Any]:
+# Downloads larger than this are aborted
+PDF_MAX_BYTES = 25 * 1024 * 1024
+
+def _check_pdf_url(url: str):
+    """Only fetch from the configured Supabase project (its storage lives on the same origin)."""
+    supabase_url, _ = get_supabase_credentials()
+    if not supabase_url:
+        raise ValueError("SUPABASE_URL is not configured; refusing to fetch remote PDFs")
+    
+    allowed = urlsplit(supabase_url)
+    target = urlsplit(url)
+    if (target.scheme, target.netloc) != (allowed.scheme, allowed.netloc):
+        raise ValueError(f"PDF URL must be on {allowed.scheme}://{allowed.netloc}")
+
+async def _fetch_pdf_file(url: str, http: httpx.AsyncClient) -> BinaryIO:
+    """
+    Stream a remote PDF into a named temporary file without buffering the whole body.
+    
+    The parsers open the file by path, so PyMuPDF maps it from disk instead of
+    being handed the whole document as bytes. The file is deleted when closed.
+    """
+    _check_pdf_url(url)
+    
+    spool = tempfile.NamedTemporaryFile(suffix=".pdf")
+    try:
+        async with http.stream("GET", url) as response:
+            response.raise_for_status()
+            if int(response.headers.get("content-length") or 0) > PDF_MAX_BYTES:
+                raise ValueError(f"PDF exceeds {PDF_MAX_BYTES} bytes")
+            
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > PDF_MAX_BYTES:
+                    raise ValueError(f"PDF exceeds {PDF_MAX_BYTES} bytes")
+                spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    
+    spool.flush()
+    return spool
+
+async def _load_pdf_text(source: str, http: httpx.AsyncClient) -> str:
+    """Extract text from a PDF given either an HTTP(S) URL or a local path."""
+    if not source.startswith(("http://", "https://")):
+        return await asyncio.to_thread(extract_text_from_pdf, source)
+    
+    pdf_file = await _fetch_pdf_file(source, http)
+    try:
+        return await asyncio.to_thread(extract_text_from_pdf, pdf_file.name)
+    finally:
+        pdf_file.close()
+
+async def run_pipeline(name: str, email: str, cv_url: str, dice_url: str, push_supabase: bool = True, return_json: bool = False) -> Dict[str, Any]:
     """
     Main pipeline function for Railway API integration.
     
@@ -43,35 +124,40 @@ def run_pipeline(name: str, email: str, cv_url: str, dice_url: str, push_supabas
     try:
         logger.info(f"Starting pipeline for candidate: {name}")
         
-        # Step 1: Extract text from PDFs
+        # Step 1: Fetch and extract both PDFs concurrently, so the DICE download
+        # overlaps CV parsing (blocking parsing runs in threads)
         logger.info("Extracting text from PDF files...")
-        cv_text = extract_text_from_pdf(cv_url)
-        dice_text = extract_text_from_pdf(dice_url)
+        async with httpx.AsyncClient(timeout=60) as http:
+            cv_text, dice_text = await asyncio.gather(
+                _load_pdf_text(cv_url, http),
+                _load_pdf_text(dice_url, http)
+            )
         
-        # Step 2: Extract structured profile data
-        logger.info("Extracting candidate profile data...")
-        profile_data = extract_candidate_profile(cv_text, dice_text)
+        # Step 2: Extract the profile and generate the interview in one OpenAI call
+        logger.info("Extracting candidate profile and generating interview...")
+        profile_data, chat_data = await generate_profile_and_interview(cv_text, dice_text, name=name, email=email)
         
-        # Step 3: Validate the extracted profile
-        logger.info("Validating extracted profile...")
-        is_valid = validate_profile(profile_data)
+        # Nothing was extracted beyond the request's own name/email and the
+        # interview is the fallback: report the failure rather than store it
+        profile_failed = not any(value for key, value in profile_data.items() if key not in ("name", "email"))
+        if profile_failed and "error" in chat_data.get("metadata", {}):
+            raise RuntimeError("Profile extraction and interview generation both failed")
         
-        if not is_valid:
+        # Step 3: Validate the extracted profile and interview
+        logger.info("Validating extracted profile...")
+        if not validate_profile(profile_data):
             logger.warning("Profile validation failed - some fields may be missing")
         
-        # Step 4: Generate interview conversation
-        logger.info("Generating personalized interview conversation...")
-        chat_data = generate_interview_chat(profile_data)
-        
         if validate_interview_data(chat_data):
             logger.info("Interview generated successfully")
         else:
             logger.warning("Interview generation failed")
         
-        # Step 5: Push to Supabase if requested
+        # Step 4: Push to Supabase if requested
         if push_supabase:
             logger.info("🔗 Pushing candidate data to Supabase...")
-            supabase_result = insert_candidate_to_supabase(
+            supabase_result = await asyncio.to_thread(
+                insert_candidate_to_supabase,
                 profile_data=profile_data,
                 chat_data=chat_data,
                 cv_url=cv_url,
@@ -83,7 +169,7 @@ def run_pipeline(name: str, email: str, cv_url: str, dice_url: str, push_supabas
             else:
                 logger.warning("⚠️ Failed to push to Supabase - check credentials")
         
-        # Step 6: Prepare response
+        # Step 5: Prepare response
         result = {
             "profile": profile_data,
             "interview": chat_data,
@@ -106,6 +192,100 @@ def run_pipeline(name: str, email: str, cv_url: str, dice_url: str, push_supabas
             "memories": []
         }
 
+def run_pipeline_batch(candidates: List[Dict[str, str]], push_supabase: bool = True, poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+    """
+    Process many candidates through the OpenAI Batch API.
+    
+    Intended for non-interactive bulk runs: interview generation is submitted
+    as a single batch job (50% cheaper, separate rate limits, 24h window)
+    instead of one live chat completion per candidate. The interactive
+    /api/process_candidate endpoint keeps using run_pipeline.
+    
+    Args:
+        candidates: List of dicts with name, email, cv_url and dice_url
+        push_supabase: Whether to push results to Supabase
+        poll_interval: Seconds between batch status checks
+    
+    Returns:
+        List of result dictionaries in the same order as candidates
+    """
+    # Step 1: Extract profiles and build one batch request per candidate
+    jobs = {}
+    requests = {}
+    for index, candidate in enumerate(candidates):
+        custom_id = candidate.get("email") or f"candidate-{index}"
+        if custom_id in jobs:
+            custom_id = f"{custom_id}-{index}"
+        
+        logger.info(f"Preparing batch request for: {candidate.get('name')}")
+        try:
+            cv_text, dice_text = extract_cv_and_dice_texts(candidate["cv_url"], candidate["dice_url"])
+            profile_data = extract_candidate_profile(cv_text, dice_text)
+        except Exception as e:
+            # One unreadable PDF shouldn't abort the rest of the run
+            logger.error(f"Error preparing {custom_id}: {e}")
+            jobs[custom_id] = {"candidate": candidate, "error": str(e)}
+            continue
+        
+        if not validate_profile(profile_data):
+            logger.warning(f"Profile validation failed for {custom_id} - some fields may be missing")
+        
+        jobs[custom_id] = {"candidate": candidate, "profile": profile_data}
+        requests[custom_id] = build_interview_request(profile_data)
+    
+    # Step 2: Submit the batch job and wait for its results
+    batch_id = None
+    outputs = {}
+    if requests:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            batch_id = submit_batch_requests(requests, os.path.join(tmp_dir, "interviews.jsonl"))
+        
+        outputs = poll_batch(batch_id, poll_interval=poll_interval)
+    
+    # Step 3: Collect results and push them to Supabase in bulk
+    results = []
+    records = []
+    for custom_id, job in jobs.items():
+        candidate = job["candidate"]
+        if "error" in job:
+            results.append({
+                "status": "error",
+                "error": job["error"],
+                "profile": {},
+                "interview": {},
+                "summary_notes": "",
+                "memories": []
+            })
+            continue
+        
+        profile_data = job["profile"]
+        generated = False
+        if custom_id in outputs:
+            try:
+                chat_data = parse_interview_response(outputs[custom_id], profile_data)
+                generated = True
+            except Exception as e:
+                logger.error(f"Error parsing interview for {custom_id}: {e}")
+        if not generated:
+            chat_data = _get_default_interview_data(profile_data)
+        
+        records.append(build_candidate_record(profile_data, chat_data, candidate["cv_url"], candidate["dice_url"]))
+        results.append({
+            "profile": profile_data,
+            "interview": chat_data,
+            "summary_notes": chat_data.get("summary_notes", ""),
+            "memories": chat_data.get("memories", []),
+            "status": "success" if generated else "error"
+        })
+    
+    if push_supabase and records:
+        inserted = insert_candidates_bulk(records)
+        if len(inserted) < len(records):
+            logger.warning(f"⚠️ Pushed {len(inserted)}/{len(records)} candidates to Supabase - check credentials")
+    
+    logger.info(f"Batch {batch_id} finished: {len(outputs)}/{len(jobs)} interviews generated")
+    return results
+
 class DocumentProcessor:
     """Main class for processing CV and DICE documents."""
     
@@ -142,7 +322,23 @@ class DocumentProcessor:
             
             # Step 2: Extract structured profile data
             logger.info("Extracting candidate profile data...")
-            profile = extract_candidate_profile(cv_text, dice_text, self.api_key)
+            cv_url = f"anu.cv.uploads/{os.path.basename(cv_pdf_path)}"
+            dice_url = f"anu.dice.uploads/{os.path.basename(dice_pdf_path)}"
+            placeholder: Optional[Future] = None
+            
+            if push_to_supabase and generate_interview:
+                # Write the row as soon as name/email stream in, while the model
+                # is still producing the rest of the profile
+                writer = ThreadPoolExecutor(max_workers=1)
+                
+                def on_identity(name: str, email: str):
+                    nonlocal placeholder
+                    placeholder = writer.submit(insert_processing_placeholder, name, email, cv_url, dice_url)
+                
+                profile = extract_candidate_profile_streaming(cv_text, dice_text, on_identity, self.api_key)
+                writer.shutdown(wait=False)
+            else:
+                profile = extract_candidate_profile(cv_text, dice_text, self.api_key)
             
             # Step 3: Validate the extracted profile
             logger.info("Validating extracted profile...")
@@ -154,7 +350,7 @@ class DocumentProcessor:
             # Step 4: Generate interview if requested
             if generate_interview:
                 logger.info("Generating personalized interview conversation...")
-                interview_data = generate_interview_chat(profile, self.api_key)
+                interview_data = run_async(generate_interview_chat(profile, self.api_key))
                 
                 if validate_interview_data(interview_data):
                     profile['interview'] = interview_data
@@ -167,17 +363,23 @@ class DocumentProcessor:
                 self._save_profile(profile, output_path)
             
             # Step 6: Push to Supabase if requested
+            row_id = placeholder.result() if placeholder else None
+            
+            if row_id is not None and 'interview' not in profile:
+                update_candidate_in_supabase(row_id, profile, {}, status="failed")
+            
             if push_to_supabase and 'interview' in profile:
                 logger.info("🔗 Pushing candidate data to Supabase...")
-                cv_url = f"anu.cv.uploads/{os.path.basename(cv_pdf_path)}"
-                dice_url = f"anu.dice.uploads/{os.path.basename(dice_pdf_path)}"
                 
-                supabase_result = insert_candidate_to_supabase(
-                    profile_data=profile,
-                    chat_data=profile['interview'],
-                    cv_url=cv_url,
-                    dice_url=dice_url
-                )
+                if row_id is not None:
+                    supabase_result = update_candidate_in_supabase(row_id, profile, profile['interview'])
+                else:
+                    supabase_result = insert_candidate_to_supabase(
+                        profile_data=profile,
+                        chat_data=profile['interview'],
+                        cv_url=cv_url,
+                        dice_url=dice_url
+                    )
                 
                 if supabase_result:
                     logger.info("✅ Successfully pushed to Supabase!")
@@ -266,8 +468,7 @@ def main():
                     print(f"  {i}. {memory}")
             
             print(f"\nChat Preview:")
-            chat_preview = format_chat_for_display(profile['interview'])
-            print(chat_preview[:800] + "..." if len(chat_preview) > 800 else chat_preview)
+            print(format_chat_for_display(profile['interview'], max_chars=800))
         
         if args.output:
             print(f"\nProfile saved to: {args.output}")
@@ -21,46 +21,96 @@ Use short, structured answers.
 Avoid guessing — return empty arrays if not found.
 """
 
-import json
+import io
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import httpx
+import ijson
+import orjson
 import openai
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from supabase_insert import cache_profile, get_cached_profile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_candidate_profile(cv_text: str, dice_text: str, api_key: Optional[str] = None) -> Dict:
-    """
-    Extract structured candidate data from CV and DICE test results.
-    
-    Args:
-        cv_text: Raw text extracted from CV PDF
-        dice_text: Raw text extracted from DICE test PDF
-        api_key: OpenAI API key (optional, can be set via environment)
+PROFILE_MODEL = "gpt-4o-mini"
+
+# Shared clients so repeated extractions reuse one keep-alive connection pool per
+# API key (None means OPENAI_API_KEY). Created on first use, because constructing
+# one needs the key
+_openai_clients: Dict[Optional[str], openai.OpenAI] = {}
+
+def get_openai_client(api_key: Optional[str] = None) -> openai.OpenAI:
+    """Return the process-wide OpenAI client for api_key (or the environment's key)."""
+    client = _openai_clients.get(api_key)
+    if client is None:
+        client = _openai_clients[api_key] = openai.OpenAI(api_key=api_key)
+    return client
+
+# Shared async clients, one per API key, so the httpx connection pool (and its TLS
+# sessions) is reused across calls. Created lazily like the sync clients and bound
+# to one event loop: run_async / close_async_clients close them before it ends
+_async_clients: Dict[Optional[str], openai.AsyncOpenAI] = {}
+_async_clients_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_async_client(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client for api_key on the running event loop."""
+    global _async_clients_loop
     
-    Returns:
-        Dictionary containing extracted candidate profile data
-    """
+    loop = asyncio.get_running_loop()
+    if _async_clients_loop is not loop:
+        # Clients left over from a loop that ended without close_async_clients
+        # can no longer be awaited; drop them and start a fresh pool
+        _async_clients.clear()
+        _async_clients_loop = loop
     
-    # Set up OpenAI client
-    if api_key:
-        client = openai.OpenAI(api_key=api_key)
-    else:
-        client = openai.OpenAI()  # Uses OPENAI_API_KEY environment variable
+    client = _async_clients.get(api_key)
+    if client is None:
+        client = _async_clients[api_key] = openai.AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                timeout=60
+            )
+        )
+    return client
+
+async def close_async_clients():
+    """Close the pooled AsyncOpenAI clients created on the running event loop."""
+    global _async_clients_loop
     
-    prompt = f"""
-CV TEXT:
-{cv_text}
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    _async_clients_loop = None
+    for client in clients:
+        await client.close()
 
-DICE TEXT:
-{dice_text}
+def run_async(coro):
+    """asyncio.run a coroutine, closing the async clients it opened before the loop shuts down."""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await close_async_clients()
+    
+    return asyncio.run(runner())
 
----
+PROFILE_SYSTEM_MSG = "You are a helpful data extractor for an AI recruiter. Analyze CV and DICE assessment data to extract structured candidate information. For DICE assessments, analyze the pattern of responses to determine work style preferences. Always return valid JSON only."
 
-Please extract the following structured data in JSON format:
+# Static instructions go before the candidate text so the request prefix is
+# byte-identical across calls and eligible for OpenAI prompt caching
+PROFILE_INSTRUCTIONS = """
+Please extract the following structured data in JSON format from the CV and DICE text at the end of this message:
 
-{{
+{
   "name": "<name>",
   "email": "<email>",
   "skills": ["...", "..."],
@@ -68,7 +118,7 @@ Please extract the following structured data in JSON format:
   "projects": ["...", "..."],
   "personality_type": "<DICE summary>",
   "tone_profile": "<interview tone>"
-}}
+}
 
 IMPORTANT GUIDELINES:
 - Return ONLY valid JSON, no additional text
@@ -80,43 +130,564 @@ IMPORTANT GUIDELINES:
 - If information is not found, use empty strings for text fields and empty arrays for lists
 """
 
+# Per-document prompts used by extract_candidate_profile: each call only sees
+# the schema for the fields its document can answer
+CV_MODEL = PROFILE_MODEL
+DICE_MODEL = PROFILE_MODEL
+
+CV_SYSTEM_MSG = "You are a helpful data extractor for an AI recruiter. Extract structured candidate information from CV text. Always return valid JSON only."
+
+CV_INSTRUCTIONS = """
+Extract the following structured data in JSON format from the CV text at the end of this message:
+
+{
+  "name": "<name>",
+  "email": "<email>",
+  "skills": ["...", "..."],
+  "cad_tools": ["SolidWorks", "Fusion 360"],
+  "projects": ["...", "..."]
+}
+
+- For skills: include technical tools, software, domains mentioned
+- For cad_tools: specifically CAD/CAM software (SolidWorks, Fusion 360, AutoCAD, etc.)
+- For projects: list actual project names/titles (max 3)
+- If information is not found, use empty strings for text fields and empty arrays for lists
+"""
+
+DICE_SYSTEM_MSG = "You are a helpful assessment analyst for an AI recruiter. Analyze the pattern of responses in a DICE assessment to determine work style preferences. Always return valid JSON only."
+
+DICE_INSTRUCTIONS = """
+Return JSON of the form {"personality_type": "<DICE summary>", "tone_profile": "<interview tone>"} for the DICE text at the end of this message.
+
+- For personality_type: determine work style (e.g., "High C (Creative), Mid D (Drive)", "Balanced DICE profile", "Detail-oriented and systematic")
+- For tone_profile: describe interview approach based on personality (e.g., "warm and curious", "structured and mentor-like", "enthusiastic and collaborative")
+- If the text is not a DICE assessment, use empty strings
+"""
+
+# Character budgets for the text sent to the model; the opening of a CV and
+# the first part of a DICE report carry everything the profile needs
+CV_MAX_CHARS = 8000
+DICE_MAX_CHARS = 4000
+
+# Only explicit "Page N", "Page N of M" and "N of M" / "N/M" footers; a bare
+# number on its own line is often a DICE score, a year or a phone number
+_PAGE_NUMBER_LINE = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+)$", re.IGNORECASE)
+
+def _prepare_text(raw: str, max_chars: int) -> str:
+    """
+    Shrink extracted PDF text before it is sent to the model.
+    
+    Drops page-number lines and repeated page headers/footers (lines of 15+
+    characters seen three or more times, keeping the first), collapses
+    whitespace, and truncates to max_chars.
+    
+    Args:
+        raw: Text from pdf_extractor
+        max_chars: Maximum number of characters to keep
+    
+    Returns:
+        Cleaned text
+    """
+    lines = [line.strip() for line in raw.splitlines()]
+    counts = Counter(line for line in lines if len(line) >= 15)
+    
+    kept = []
+    seen = set()
+    for line in lines:
+        if not line or _PAGE_NUMBER_LINE.match(line):
+            continue
+        if counts[line] >= 3:
+            if line in seen:
+                continue
+            seen.add(line)
+        kept.append(line)
+    
+    text = re.sub(r"\s+", " ", " ".join(kept)).strip()
+    if len(text) > max_chars:
+        logger.info(f"Truncating document text from {len(text)} to {max_chars} characters")
+        text = text[:max_chars]
+    return text
+
+def build_profile_prompt(cv_text: str, dice_text: str, extra_instructions: str = "") -> str:
+    """
+    Build the user prompt asking for the structured candidate profile.
+    
+    Args:
+        cv_text: Raw text extracted from CV PDF
+        dice_text: Raw text extracted from DICE test PDF
+        extra_instructions: Static text appended to the instructions, ahead of the candidate text
+    
+    Returns:
+        Prompt with the fixed instructions first and the candidate text last
+    """
+    return f"""{PROFILE_INSTRUCTIONS}{extra_instructions}
+---
+CV TEXT:
+{_prepare_text(cv_text, CV_MAX_CHARS)}
+
+DICE TEXT:
+{_prepare_text(dice_text, DICE_MAX_CHARS)}
+"""
+
+def build_profile_request(cv_text: str, dice_text: str) -> Dict:
+    """Build the chat-completion request body for single-candidate profile extraction."""
+    return {
+        "model": PROFILE_MODEL,
+        "messages": [
+            {"role": "system", "content": PROFILE_SYSTEM_MSG},
+            {"role": "user", "content": build_profile_prompt(cv_text, dice_text)}
+        ],
+        "temperature": 0.1,  # Low temperature for consistent extraction
+        "response_format": {"type": "json_object"}  # Guarantees a parseable JSON object
+    }
+
+def profile_cache_key(cv_text: str, dice_text: str) -> str:
+    """Hash the normalized CV and DICE text into the profile_cache lookup key."""
+    return hashlib.sha256((cv_text.strip() + "\x00" + dice_text.strip()).encode()).hexdigest()
+
+_DEFAULT_KEYS = ("name", "email", "skills", "cad_tools", "projects", "personality_type", "tone_profile")
+_LIST_FIELDS = frozenset({"skills", "cad_tools", "projects"})
+_STRING_FIELDS = tuple(key for key in _DEFAULT_KEYS if key not in _LIST_FIELDS)
+_JSON_STRING = r'"((?:[^"\\]|\\.)*)"'
+
+def _iter_json_objects(text: str):
+    """Yield each balanced {...} span in text, skipping braces inside JSON strings."""
+    for start in (i for i, char in enumerate(text) if char == "{"):
+        depth, in_string, escaped = 0, False, False
+        for end in range(start, len(text)):
+            char = text[end]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    yield text[start:end + 1]
+                    break
+
+def _robust_json_parse(text: str) -> Optional[Dict]:
+    """
+    Recover a profile dict from a model response that may not be bare JSON.
+    
+    Tries, in order: the whole text, each balanced {...} block (handles ```json
+    fences and "Here is the JSON:" preambles), then per-key regexes. The last
+    tier returns only the keys it could find.
+    
+    Args:
+        text: Raw message content from the model
+    
+    Returns:
+        Parsed dictionary, or None if nothing could be recovered
+    """
+    try:
+        parsed = orjson.loads(text)
+        if isinstance(parsed, dict):
+            return parsed
+    except orjson.JSONDecodeError:
+        pass
+    
+    for candidate in _iter_json_objects(text):
+        try:
+            parsed = orjson.loads(candidate)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    
+    # A value that isn't valid JSON on its own (e.g. a raw newline inside the
+    # string) only loses that key
+    recovered = {}
+    for key in _STRING_FIELDS:
+        match = re.search(rf'"{key}"\s*:\s*{_JSON_STRING}', text)
+        if match:
+            try:
+                recovered[key] = orjson.loads(f'"{match.group(1)}"')
+            except orjson.JSONDecodeError:
+                continue
+    for key in _LIST_FIELDS:
+        match = re.search(rf'"{key}"\s*:\s*\[(.*?)\]', text, re.DOTALL)
+        if match:
+            try:
+                recovered[key] = [orjson.loads(f'"{item}"') for item in re.findall(_JSON_STRING, match.group(1))]
+            except orjson.JSONDecodeError:
+                continue
+    
+    if recovered:
+        logger.warning(f"Recovered profile fields by pattern match: {sorted(recovered)}")
+        return recovered
+    return None
+
+def _finish_profile(content: str, cache_key: str) -> Dict:
+    """Parse a profile response, cache it if complete, and fill any missing fields."""
+    return _complete_profile(_robust_json_parse(content.strip()), cache_key)
+
+def _complete_profile(parsed_data: Optional[Dict], cache_key: str) -> Dict:
+    """Cache a parsed profile if it has every field, and fill any missing fields."""
+    if not parsed_data:
+        logger.error("No profile fields could be extracted from the model response")
+        return _get_default_profile()
+    
+    logger.info(f"Successfully extracted profile for: {parsed_data.get('name', 'Unknown')}")
+    # Partial pattern-match recoveries are returned but never cached
+    if validate_profile(parsed_data):
+        cache_profile(cache_key, parsed_data)
+    return {**_get_default_profile(), **parsed_data}
+
+def _extract_fields(client: openai.OpenAI, model: str, system_msg: str, instructions: str, label: str, text: str, keys: Tuple[str, ...]) -> Dict:
+    """Run one single-document extraction call and keep only the keys it is responsible for."""
     try:
         response = client.chat.completions.create(
-            model="gpt-4",
+            model=model,
             messages=[
-                {"role": "system", "content": "You are a helpful data extractor for an AI recruiter. Analyze CV and DICE assessment data to extract structured candidate information. For DICE assessments, analyze the pattern of responses to determine work style preferences. Always return valid JSON only."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": f"{instructions}\n---\n{label}:\n{text}\n"}
             ],
-            temperature=0.1  # Low temperature for consistent extraction
+            temperature=0.1,  # Low temperature for consistent extraction
+            response_format={"type": "json_object"}
         )
+        parsed = _robust_json_parse(response.choices[0].message.content.strip()) or {}
+        return {key: parsed[key] for key in keys if key in parsed}
+    except Exception as e:
+        logger.error(f"Error calling OpenAI API for {label}: {e}")
+        return {}
+
+def _extract_cv_fields(cv_text: str, client: openai.OpenAI) -> Dict:
+    """Extract name, email, skills, cad_tools and projects from the CV."""
+    return _extract_fields(
+        client, CV_MODEL, CV_SYSTEM_MSG, CV_INSTRUCTIONS, "CV TEXT",
+        _prepare_text(cv_text, CV_MAX_CHARS),
+        ("name", "email", "skills", "cad_tools", "projects")
+    )
+
+def _extract_dice_fields(dice_text: str, client: openai.OpenAI) -> Dict:
+    """Extract personality_type and tone_profile from the DICE assessment."""
+    return _extract_fields(
+        client, DICE_MODEL, DICE_SYSTEM_MSG, DICE_INSTRUCTIONS, "DICE TEXT",
+        _prepare_text(dice_text, DICE_MAX_CHARS),
+        ("personality_type", "tone_profile")
+    )
+
+def extract_candidate_profile(cv_text: str, dice_text: str, api_key: Optional[str] = None) -> Dict:
+    """
+    Extract structured candidate data from CV and DICE test results.
+    
+    Args:
+        cv_text: Raw text extracted from CV PDF
+        dice_text: Raw text extracted from DICE test PDF
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        Dictionary containing extracted candidate profile data
+    """
+    
+    # Re-uploads and retries of the same documents skip the model entirely
+    cache_key = profile_cache_key(cv_text, dice_text)
+    cached = get_cached_profile(cache_key)
+    if cached is not None:
+        return cached
+    
+    client = get_openai_client(api_key)
+    
+    # The CV and DICE halves of the profile are independent; ask for them in
+    # two small requests side by side instead of one prompt with both documents
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        cv_future = executor.submit(_extract_cv_fields, cv_text, client)
+        dice_future = executor.submit(_extract_dice_fields, dice_text, client)
+        parsed_data = {**cv_future.result(), **dice_future.result()}
+    
+    return _complete_profile(parsed_data, cache_key)
 
-        extracted_data = response.choices[0].message.content.strip()
+def extract_candidate_profile_streaming(cv_text: str, dice_text: str, on_identity: Optional[Callable[[str, str], None]] = None, api_key: Optional[str] = None) -> Dict:
+    """
+    Stream the profile completion and report the candidate's identity as soon as it is known.
+    
+    The JSON is fed through an incremental parser while it streams, so `on_identity`
+    fires once the top-level "name" and "email" values are complete, typically well
+    before the model has finished the skills and projects lists.
+    
+    Args:
+        cv_text: Raw text extracted from CV PDF
+        dice_text: Raw text extracted from DICE test PDF
+        on_identity: Callback invoked once with (name, email)
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        Dictionary containing extracted candidate profile data
+    """
+    cache_key = profile_cache_key(cv_text, dice_text)
+    cached = get_cached_profile(cache_key)
+    if cached is not None:
+        if on_identity:
+            on_identity(cached.get("name", ""), cached.get("email", ""))
+        return cached
+    
+    client = get_openai_client(api_key)
+    
+    try:
+        stream = client.chat.completions.create(**build_profile_request(cv_text, dice_text), stream=True)
         
-        # Parse JSON response
-        try:
-            parsed_data = json.loads(extracted_data)
-            logger.info(f"Successfully extracted profile for: {parsed_data.get('name', 'Unknown')}")
-            return parsed_data
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
-            logger.error(f"Raw response: {extracted_data}")
-            return _get_default_profile()
+        buffer = io.StringIO()
+        identity: Dict[str, str] = {}
+        completed = ijson.sendable_list()
+        parser = ijson.kvitems_coro(completed, "")
+        
+        for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            piece = chunk.choices[0].delta.content
+            buffer.write(piece)
+            
+            if parser is None:
+                continue
+            try:
+                parser.send(piece.encode("utf-8"))
+            except ijson.JSONError:
+                # Fall back to parsing the full buffer once the stream ends
+                parser = None
+                continue
             
+            for key, value in completed:
+                if key in ("name", "email") and isinstance(value, str):
+                    identity[key] = value
+            del completed[:]
+            
+            if on_identity and len(identity) == 2:
+                on_identity(identity["name"], identity["email"])
+                on_identity = None
+        
+        return _finish_profile(buffer.getvalue(), cache_key)
+    
     except Exception as e:
         logger.error(f"Error calling OpenAI API: {e}")
         return _get_default_profile()
 
+@retry(
+    stop=stop_after_attempt(6),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    retry=retry_if_exception_type(openai.RateLimitError),
+    reraise=True
+)
+async def _create_profile_completion(client: openai.AsyncOpenAI, request: Dict):
+    """Send one extraction request, backing off exponentially on rate limits."""
+    return await client.chat.completions.create(**request)
+
+async def extract_candidate_profile_async(cv_text: str, dice_text: str, client: openai.AsyncOpenAI, sem: asyncio.Semaphore) -> Dict:
+    """
+    Async variant of extract_candidate_profile for running many extractions concurrently.
+    
+    Args:
+        cv_text: Raw text extracted from CV PDF
+        dice_text: Raw text extracted from DICE test PDF
+        client: Shared AsyncOpenAI client
+        sem: Semaphore bounding the number of in-flight requests
+    
+    Returns:
+        Dictionary containing extracted candidate profile data
+    """
+    cache_key = profile_cache_key(cv_text, dice_text)
+    cached = await asyncio.to_thread(get_cached_profile, cache_key)
+    if cached is not None:
+        return cached
+    
+    async with sem:
+        try:
+            response = await _create_profile_completion(client, build_profile_request(cv_text, dice_text))
+            return await asyncio.to_thread(_finish_profile, response.choices[0].message.content, cache_key)
+        except Exception as e:
+            logger.error(f"Error calling OpenAI API: {e}")
+            return _get_default_profile()
+
+async def extract_candidate_profiles_concurrently(pairs: List[Tuple[str, str]], concurrency: int = 20, api_key: Optional[str] = None) -> List[Dict]:
+    """
+    Extract many profiles concurrently, throttled to stay within OpenAI rate limits.
+    
+    Args:
+        pairs: List of (cv_text, dice_text) tuples
+        concurrency: Maximum number of requests in flight at once
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        List of profile dictionaries in the same order as pairs
+    """
+    client = get_async_client(api_key)
+    sem = asyncio.Semaphore(concurrency)
+    
+    return await asyncio.gather(*[
+        extract_candidate_profile_async(cv_text, dice_text, client, sem)
+        for cv_text, dice_text in pairs
+    ])
+
+BATCH_PROFILE_INSTRUCTIONS = """
+The text at the end of this message contains several candidates, each introduced by a "### Candidate <number>" header.
+Apply this to every candidate and respond with {"profiles": [...]}: a JSON array with one profile object per candidate in candidate order, each with an extra "index" field set to the candidate number.
+"""
+
+def extract_candidate_profiles_batch(pairs: List[Tuple[str, str]], api_key: Optional[str] = None) -> List[Dict]:
+    """
+    Extract profiles for several candidates in a single chat completion.
+    
+    The extraction instructions are sent once for the whole batch instead of
+    once per candidate, which saves input tokens and request quota in bulk runs.
+    
+    Args:
+        pairs: List of (cv_text, dice_text) tuples
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        List of profile dictionaries in the same order as pairs
+    """
+    if not pairs:
+        return []
+    
+    client = get_openai_client(api_key)
+    
+    sections = []
+    for index, (cv_text, dice_text) in enumerate(pairs):
+        sections.append(
+            f"### Candidate {index}\n\nCV TEXT:\n{_prepare_text(cv_text, CV_MAX_CHARS)}"
+            f"\n\nDICE TEXT:\n{_prepare_text(dice_text, DICE_MAX_CHARS)}"
+        )
+    candidates_text = "\n\n".join(sections)
+    
+    prompt = f"""{PROFILE_INSTRUCTIONS}{BATCH_PROFILE_INSTRUCTIONS}
+---
+{len(pairs)} candidates:
+
+{candidates_text}
+"""
+    
+    profiles = [_get_default_profile() for _ in pairs]
+    try:
+        response = client.chat.completions.create(
+            model=PROFILE_MODEL,
+            messages=[
+                {"role": "system", "content": PROFILE_SYSTEM_MSG},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,  # Low temperature for consistent extraction
+            response_format={"type": "json_object"}
+        )
+        
+        extracted = orjson.loads(response.choices[0].message.content).get("profiles", [])
+        for position, profile in enumerate(extracted):
+            if not isinstance(profile, dict):
+                continue
+            index = profile.pop("index", position)
+            if isinstance(index, int) and 0 <= index < len(pairs):
+                profiles[index] = {**profiles[index], **profile}
+        
+        logger.info(f"Successfully extracted {len(extracted)}/{len(pairs)} profiles in one request")
+    except Exception as e:
+        logger.error(f"Error calling OpenAI API for batch extraction: {e}")
+    
+    return profiles
+
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def submit_batch_requests(requests: Dict[str, Dict], jsonl_path: str, api_key: Optional[str] = None) -> str:
+    """
+    Write chat-completion requests to a JSONL file and submit them as an OpenAI batch.
+    
+    Args:
+        requests: Mapping of custom_id to chat-completion request body
+        jsonl_path: Where to write the batch input file
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        The batch ID
+    """
+    client = get_openai_client(api_key)
+    
+    with open(jsonl_path, "wb") as f:
+        for custom_id, body in requests.items():
+            f.write(orjson.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            }) + b"\n")
+    
+    with open(jsonl_path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(requests)} request(s)")
+    return batch.id
+
+def submit_candidates_batch(pairs: List[Tuple[str, str]], jsonl_path: str, api_key: Optional[str] = None) -> str:
+    """
+    Submit profile extraction for many candidates through the OpenAI Batch API.
+    
+    Batch jobs cost 50% less and draw on a separate rate-limit pool, at the price
+    of a completion window of up to 24h, so use this for overnight bulk ingests.
+    Results are keyed by custom_id "candidate-<index>"; collect them with poll_batch.
+    
+    Args:
+        pairs: List of (cv_text, dice_text) tuples
+        jsonl_path: Where to write the batch input file
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        The batch ID
+    """
+    requests = {
+        f"candidate-{index}": build_profile_request(cv_text, dice_text)
+        for index, (cv_text, dice_text) in enumerate(pairs)
+    }
+    return submit_batch_requests(requests, jsonl_path, api_key)
+
+def poll_batch(batch_id: str, poll_interval: float = 30.0, api_key: Optional[str] = None) -> Dict[str, str]:
+    """
+    Wait for a batch to finish and download its results.
+    
+    Args:
+        batch_id: ID returned by submit_batch_requests / submit_candidates_batch
+        poll_interval: Seconds between status checks
+        api_key: OpenAI API key (optional, can be set via environment)
+    
+    Returns:
+        Mapping of custom_id to the message content of each successful response
+    """
+    client = get_openai_client(api_key)
+    
+    batch = client.batches.retrieve(batch_id)
+    while batch.status not in BATCH_TERMINAL_STATUSES:
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch_id)
+        logger.info(f"Batch {batch_id} status: {batch.status}")
+    
+    if batch.status != "completed":
+        logger.error(f"Batch {batch_id} ended with status '{batch.status}'")
+    
+    outputs = {}
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                outputs[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+            else:
+                logger.error(f"Batch request {record.get('custom_id')} failed: {record.get('error')}")
+    
+    return outputs
+
 def _get_default_profile() -> Dict:
     """Return default profile structure when extraction fails."""
-    return {
-        "name": "",
-        "email": "",
-        "skills": [],
-        "cad_tools": [],
-        "projects": [],
-        "personality_type": "",
-        "tone_profile": ""
-    }
+    return {key: ([] if key in _LIST_FIELDS else "") for key in _DEFAULT_KEYS}
 
 def validate_profile(profile: Dict) -> bool:
     """
@@ -128,9 +699,7 @@ def validate_profile(profile: Dict) -> bool:
     Returns:
         True if profile is valid, False otherwise
     """
-    required_fields = ["name", "email", "skills", "cad_tools", "projects", "personality_type", "tone_profile"]
-    
-    for field in required_fields:
+    for field in _DEFAULT_KEYS:
         if field not in profile:
             logger.warning(f"Missing required field: {field}")
             return False
@@ -169,7 +738,7 @@ if __name__ == "__main__":
     # Test the extraction
     result = extract_candidate_profile(sample_cv, sample_dice)
     print("Extracted Profile:")
-    print(json.dumps(result, indent=2))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
     
     # Validate the result
     is_valid = validate_profile(result)
@@ -15,92 +15,361 @@ Insert a candidate profile + AI interview data into Supabase table `anu_intervie
 """
 
 import os
-import json
+import httpx
+import orjson
 import logging
-from typing import Dict, Optional
-from supabase import create_client, Client
+import functools
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Get Supabase credentials from environment
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+@functools.cache
+def get_supabase_credentials() -> Tuple[Optional[str], Optional[str]]:
+    """
+    Read SUPABASE_URL and SUPABASE_KEY from the environment once per process.
+    
+    Read on first use rather than at import, because callers import this
+    module before running load_dotenv().
+    """
+    return os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+
+@functools.cache
+def get_supabase_pooler_url() -> Optional[str]:
+    """Read SUPABASE_POOLER_URL (Supavisor connection string) once per process."""
+    return os.getenv("SUPABASE_POOLER_URL")
+
+@functools.cache
+def get_supabase_db_url() -> Optional[str]:
+    """Read SUPABASE_DB_URL (Postgres connection string for SQLAlchemy) once per process."""
+    return os.getenv("SUPABASE_DB_URL")
+
+def check_supabase_credentials(supabase_url: Optional[str], supabase_key: Optional[str]) -> Optional[str]:
+    """
+    Validate the shape of Supabase credentials locally, without any network I/O.
+    
+    Args:
+        supabase_url: Project URL
+        supabase_key: Legacy JWT API key or sb_publishable_/sb_secret_ key
+    
+    Returns:
+        A description of the problem, or None if the credentials look usable
+    """
+    if not supabase_url or not supabase_key:
+        return "SUPABASE_URL and SUPABASE_KEY must both be set"
+    # Plain http is only expected from a local `supabase start` stack
+    if not supabase_url.startswith(("https://", "http://localhost", "http://127.0.0.1")):
+        return f"SUPABASE_URL must start with https:// (got {supabase_url!r})"
+    if supabase_key.startswith("sb_"):
+        return None
+    if len(supabase_key) < 40 or len(supabase_key.split(".")) != 3:
+        return "SUPABASE_KEY is neither a JWT (three dot-separated segments) nor an sb_ API key"
+    return None
+
+# Process-wide client, set on the first successful get_supabase_client() call
+_client: Optional[Client] = None
+
+# Connection pool handed to supabase-py. Together with the singleton above this
+# keeps one multiplexed HTTP/2 connection alive between queries instead of
+# paying a TLS handshake each time (keep-alive is easy to lose in scripts)
+SUPABASE_KEEPALIVE_CONNECTIONS = 10
+SUPABASE_KEEPALIVE_EXPIRY = 40  # seconds
+SUPABASE_TIMEOUT = 120  # seconds, supabase-py's default PostgREST timeout
 
 def get_supabase_client() -> Optional[Client]:
-    """Initialize and return Supabase client."""
-    if not SUPABASE_URL or not SUPABASE_KEY:
+    """Initialize the Supabase client once and reuse it (and its connection pool) for every call."""
+    global _client
+    
+    # Only a successfully created client is kept, so a failed attempt is retried next call
+    if _client is not None:
+        return _client
+    
+    supabase_url, supabase_key = get_supabase_credentials()
+    if not supabase_url or not supabase_key:
         logger.error("❌ Missing Supabase credentials. Please set SUPABASE_URL and SUPABASE_KEY in your .env file")
         return None
     
+    problem = check_supabase_credentials(supabase_url, supabase_key)
+    if problem:
+        logger.error(f"❌ Invalid Supabase credentials: {problem}")
+        return None
+    
     try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=SUPABASE_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY
+            ),
+            timeout=SUPABASE_TIMEOUT
+        )
+        _client = create_client(supabase_url, supabase_key, options=ClientOptions(httpx_client=http_client))
         logger.info("✅ Supabase client initialized successfully")
-        return supabase
+        return _client
     except Exception as e:
         logger.error(f"❌ Error initializing Supabase client: {e}")
         return None
 
-def insert_candidate_to_supabase(profile_data: Dict, chat_data: Dict, cv_url: str, dice_url: str) -> Optional[Dict]:
+# Direct Postgres access through Supavisor for latency-sensitive queries
+_pg_pool = None
+
+def get_pg_pool():
     """
-    Insert candidate profile and interview data into Supabase.
+    Return a psycopg connection pool on the Supabase pooler, opened on first use.
+    
+    Plain SQL over a pooled connection skips the PostgREST HTTP layer entirely.
+    Use the session pooler URL (port 5432). prepare_threshold=None disables
+    server-side prepared statements, which the transaction pooler (port 6543)
+    cannot route between connections.
+    
+    Returns:
+        psycopg_pool.ConnectionPool, or None when SUPABASE_POOLER_URL is not set
+    """
+    global _pg_pool
+    
+    if _pg_pool is not None:
+        return _pg_pool
+    
+    dsn = get_supabase_pooler_url()
+    if not dsn:
+        return None
+    
+    try:
+        # Only needed when a pooler URL is configured
+        from psycopg_pool import ConnectionPool
+        
+        _pg_pool = ConnectionPool(
+            dsn,
+            min_size=2,
+            max_size=10,
+            timeout=2,
+            kwargs={"prepare_threshold": None},
+            open=True
+        )
+        logger.info("✅ Supabase pooler connection pool initialized")
+        return _pg_pool
+    except Exception as e:
+        logger.error(f"❌ Error initializing Supabase pooler connection pool: {e}")
+        return None
+
+# SQLAlchemy engine for engine-style access, created on first get_engine() call
+_engine = None
+
+def get_engine():
+    """
+    Return the process-wide SQLAlchemy engine for SUPABASE_DB_URL.
+    
+    The pool is kept small (3 + 2 overflow per process) to stay well inside
+    Supabase's connection limit across workers. Connections are pinged before
+    use and recycled every 30 minutes, so ones the pooler closed while idle
+    are replaced instead of failing a query.
+    
+    Returns:
+        sqlalchemy.engine.Engine, or None when SUPABASE_DB_URL is not set
+    """
+    global _engine
+    
+    if _engine is not None:
+        return _engine
+    
+    db_url = get_supabase_db_url()
+    if not db_url:
+        return None
+    
+    try:
+        # Only needed when a database URL is configured
+        from sqlalchemy import create_engine
+        
+        # Use the psycopg 3 driver already required for the pooler path
+        for prefix in ("postgresql://", "postgres://"):
+            if db_url.startswith(prefix):
+                db_url = "postgresql+psycopg://" + db_url[len(prefix):]
+        
+        _engine = create_engine(
+            db_url,
+            pool_size=3,
+            max_overflow=2,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            pool_timeout=30
+        )
+        logger.info("✅ SQLAlchemy engine initialized")
+        return _engine
+    except Exception as e:
+        logger.error(f"❌ Error initializing SQLAlchemy engine: {e}")
+        return None
+
+# PostgREST accepts a list of rows per insert; keep each request comfortably sized
+BULK_INSERT_CHUNK_SIZE = 500
+
+def build_candidate_record(profile_data: Dict, chat_data: Dict, cv_url: Optional[str] = None, dice_url: Optional[str] = None, status: str = "pending") -> Dict:
+    """Map profile and interview data onto `anu_interviews` columns."""
+    data = {
+        "name": profile_data.get("name", ""),
+        "email": profile_data.get("email", ""),
+        "skills": profile_data.get("skills", []),  # jsonb array, GIN-indexed
+        "status": status
+    }
+    
+    # Add optional fields if they exist
+    if profile_data.get("personality_type"):
+        data["personality_type"] = profile_data.get("personality_type", "")
+    if profile_data.get("tone_profile"):
+        data["tone_profile"] = profile_data.get("tone_profile", "")
+    if chat_data.get("summary_notes"):
+        data["summary_notes"] = chat_data.get("summary_notes", "")
+    if chat_data.get("memories"):
+        data["memories"] = chat_data.get("memories", [])
+    if cv_url is not None:
+        data["cv_url"] = cv_url
+    if dice_url is not None:
+        data["dice_url"] = dice_url
+    
+    return data
+
+def insert_processing_placeholder(name: str, email: str, cv_url: str, dice_url: str) -> Optional[int]:
+    """
+    Insert a minimal `processing` row as soon as the candidate's identity is known.
     
     Args:
-        profile_data: Dictionary containing candidate profile information
-        chat_data: Dictionary containing interview chat data
+        name: Candidate name
+        email: Candidate email
         cv_url: URL/path to CV file in Supabase Storage
         dice_url: URL/path to DICE file in Supabase Storage
     
     Returns:
-        Supabase response data or None if failed
+        ID of the inserted row or None if failed
     """
     try:
-        # Get Supabase client
         supabase = get_supabase_client()
         if not supabase:
             return None
         
-        # Prepare data for insertion - start with minimal fields to test
-        data = {
-            "name": profile_data.get("name", ""),
-            "email": profile_data.get("email", ""),
+        result = supabase.table("anu_interviews").insert({
+            "name": name,
+            "email": email,
             "cv_url": cv_url,
             "dice_url": dice_url,
-            "skills": ", ".join(profile_data.get("skills", [])),  # Convert list to string
-            "status": "pending"
-        }
+            "status": "processing"
+        }).execute()
         
-        # Add optional fields if they exist
-        if profile_data.get("personality_type"):
-            data["personality_type"] = profile_data.get("personality_type", "")
-        if profile_data.get("tone_profile"):
-            data["tone_profile"] = profile_data.get("tone_profile", "")
-        if chat_data.get("summary_notes"):
-            data["summary_notes"] = chat_data.get("summary_notes", "")
-        if chat_data.get("memories"):
-            data["memories"] = chat_data.get("memories", [])
+        if result.data:
+            logger.info(f"📝 Inserted processing row for: {name}")
+            return result.data[0].get("id")
+        return None
+    except Exception as e:
+        logger.error(f"❌ Error inserting placeholder into Supabase: {e}")
+        return None
+
+def update_candidate_in_supabase(row_id: int, profile_data: Dict, chat_data: Dict, status: str = "pending") -> Optional[Dict]:
+    """
+    Fill in a row created by insert_processing_placeholder once processing finishes.
+    
+    Args:
+        row_id: ID returned by insert_processing_placeholder
+        profile_data: Dictionary containing candidate profile information
+        chat_data: Dictionary containing interview chat data
+        status: Final status for the row
+    
+    Returns:
+        Supabase response data or None if failed
+    """
+    try:
+        supabase = get_supabase_client()
+        if not supabase:
+            return None
+        
+        data = build_candidate_record(profile_data, chat_data, status=status)
+        result = supabase.table("anu_interviews").update(data).eq("id", row_id).execute()
+        logger.info(f"✅ Updated candidate row {row_id} ({status})")
+        return result.data
+    except Exception as e:
+        logger.error(f"❌ Error updating Supabase row {row_id}: {e}")
+        return None
+
+def insert_candidates_bulk(records: List[Dict]) -> List[Dict]:
+    """
+    Insert many `anu_interviews` rows with one request per chunk of up to 500 rows.
+    
+    Args:
+        records: Row dictionaries, e.g. from build_candidate_record
+    
+    Returns:
+        Inserted rows as returned by Supabase (shorter than records if a chunk failed)
+    """
+    supabase = get_supabase_client()
+    if not supabase or not records:
+        return []
+    
+    inserted = []
+    for start in range(0, len(records), BULK_INSERT_CHUNK_SIZE):
+        chunk = records[start:start + BULK_INSERT_CHUNK_SIZE]
+        try:
+            result = supabase.table("anu_interviews").insert(chunk).execute()
+            inserted.extend(result.data or [])
+        except Exception as e:
+            logger.error(f"❌ Error inserting rows {start}-{start + len(chunk) - 1} into Supabase: {e}")
+    
+    logger.info(f"📊 Inserted {len(inserted)}/{len(records)} record(s)")
+    return inserted
+
+def find_existing_emails(emails: List[str]) -> Set[str]:
+    """
+    Return which of the given emails already have an `anu_interviews` row.
+    
+    Uses one IN-filtered select per chunk rather than one lookup per email, so
+    bulk runs can check for duplicates in a single round-trip.
+    
+    Args:
+        emails: Candidate email addresses
+    
+    Returns:
+        Set of emails that are already stored
+    """
+    supabase = get_supabase_client()
+    if not supabase or not emails:
+        return set()
+    
+    existing = set()
+    for start in range(0, len(emails), BULK_INSERT_CHUNK_SIZE):
+        chunk = emails[start:start + BULK_INSERT_CHUNK_SIZE]
+        try:
+            result = supabase.table("anu_interviews").select("email").in_("email", chunk).execute()
+            existing.update(row["email"] for row in result.data or [])
+        except Exception as e:
+            logger.error(f"❌ Error looking up existing candidates: {e}")
+    return existing
+
+def insert_candidate_to_supabase(profile_data: Dict, chat_data: Dict, cv_url: str, dice_url: str) -> Optional[Dict]:
+    """
+    Insert candidate profile and interview data into Supabase.
+    
+    Args:
+        profile_data: Dictionary containing candidate profile information
+        chat_data: Dictionary containing interview chat data
+        cv_url: URL/path to CV file in Supabase Storage
+        dice_url: URL/path to DICE file in Supabase Storage
+    
+    Returns:
+        Supabase response data or None if failed
+    """
+    try:
+        data = build_candidate_record(profile_data, chat_data, cv_url, dice_url)
         
         logger.info(f"📝 Inserting candidate: {data['name']}")
         
         # Debug: Print the exact data being sent
         print("📤 Inserting the following data to Supabase:")
-        print(json.dumps(data, indent=2))
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
         
-        # Insert into Supabase with better error handling
-        try:
-            result = supabase.table("anu_interviews").insert(data).execute()
-            print("✅ Supabase insert successful!")
-            return result.data
-        except Exception as insert_error:
-            print(f"❌ Error inserting into Supabase: {insert_error}")
-            print(f"   Error type: {type(insert_error).__name__}")
-            return None
-        
-        if result.data:
+        inserted = insert_candidates_bulk([data])
+        if inserted:
             logger.info("✅ Successfully inserted candidate data into Supabase!")
-            logger.info(f"📊 Inserted {len(result.data)} record(s)")
-            return result.data
+            return inserted
         else:
             logger.error("❌ No data returned from Supabase insert")
             return None
@@ -109,21 +378,118 @@ def insert_candidate_to_supabase(profile_data: Dict, chat_data: Dict, cv_url: st
         logger.error(f"❌ Error inserting into Supabase: {e}")
         return None
 
-def test_supabase_connection() -> bool:
-    """Test Supabase connection and table access."""
+def get_cached_profile(cache_key: str) -> Optional[Dict]:
+    """
+    Look up a previously extracted profile in the `profile_cache` table.
+    
+    Args:
+        cache_key: SHA-256 hex digest of the normalized CV + DICE text
+    
+    Returns:
+        Cached profile dictionary or None on a miss (or when Supabase is not configured)
+    """
+    if not all(get_supabase_credentials()):
+        return None
+    
     try:
         supabase = get_supabase_client()
         if not supabase:
-            return False
+            return None
         
-        # Try to query the table to test connection
-        result = supabase.table("anu_interviews").select("count", count="exact").limit(1).execute()
-        logger.info("✅ Supabase connection test successful!")
-        return True
+        result = supabase.table("profile_cache").select("profile").eq("hash", cache_key).limit(1).execute()
+        if result.data:
+            logger.info(f"♻️ Profile cache hit: {cache_key[:12]}")
+            return result.data[0]["profile"]
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Profile cache lookup failed: {e}")
+        return None
+
+def cache_profile(cache_key: str, profile_data: Dict) -> None:
+    """
+    Store an extracted profile in the `profile_cache` table.
+    
+    Args:
+        cache_key: SHA-256 hex digest of the normalized CV + DICE text
+        profile_data: Profile dictionary returned by the extraction model
+    """
+    if not all(get_supabase_credentials()):
+        return
+    
+    try:
+        supabase = get_supabase_client()
+        if not supabase:
+            return
         
+        supabase.table("profile_cache").upsert({
+            "hash": cache_key,
+            "profile": profile_data,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }).execute()
     except Exception as e:
-        logger.error(f"❌ Supabase connection test failed: {e}")
-        return False
+        logger.warning(f"⚠️ Profile cache write failed: {e}")
+
+# undefined_table from Postgres, PostgREST's schema-cache miss, or the bare 404
+# postgrest-py reports for a HEAD request (which carries no error body)
+MISSING_TABLE_CODES = {"42P01", "PGRST205", 404}
+
+def probe_anu_interviews() -> Tuple[str, Optional[int]]:
+    """
+    Check connectivity and access to `anu_interviews` with a single HEAD request.
+    
+    Returns:
+        Tuple of (status, row_count). Status is "ok", "no_client",
+        "missing_table", "api_error" or "connection_failed"; row_count is
+        only set when status is "ok"
+    """
+    pool = get_pg_pool()
+    if pool is not None:
+        return _probe_anu_interviews_sql(pool)
+    
+    supabase = get_supabase_client()
+    if not supabase:
+        return "no_client", None
+    
+    try:
+        result = supabase.table("anu_interviews").select("id", count="exact", head=True).execute()
+        return "ok", result.count
+    except APIError as e:
+        logger.error(f"❌ Supabase rejected the table probe: {e}")
+        return ("missing_table" if e.code in MISSING_TABLE_CODES else "api_error"), None
+    except Exception as e:
+        logger.error(f"❌ Could not reach Supabase: {e}")
+        return "connection_failed", None
+
+def _probe_anu_interviews_sql(pool) -> Tuple[str, Optional[int]]:
+    """probe_anu_interviews over the pooler: one SELECT count(*) on a pooled connection."""
+    import psycopg
+    
+    try:
+        with pool.connection() as conn:
+            row = conn.execute("SELECT count(*) FROM anu_interviews").fetchone()
+        return "ok", row[0]
+    except psycopg.errors.UndefinedTable as e:
+        logger.error(f"❌ Supabase rejected the table probe: {e}")
+        return "missing_table", None
+    except psycopg.DatabaseError as e:
+        if isinstance(e, psycopg.OperationalError):
+            logger.error(f"❌ Could not reach Supabase pooler: {e}")
+            return "connection_failed", None
+        logger.error(f"❌ Supabase rejected the table probe: {e}")
+        return "api_error", None
+    except Exception as e:
+        logger.error(f"❌ Could not reach Supabase pooler: {e}")
+        return "connection_failed", None
+
+def test_supabase_connection() -> bool:
+    """Test Supabase connection and table access."""
+    status, _ = probe_anu_interviews()
+    if status == "ok":
+        logger.info("✅ Supabase connection test successful!")
+        return True
+    
+    logger.error(f"❌ Supabase connection test failed: {status}")
+    return False
 
 def get_table_schema() -> Optional[Dict]:
     """Get the table schema to understand available columns."""
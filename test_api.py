@@ -12,10 +12,16 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# One session for all checks so the connection to the local server is reused
+SESSION = requests.Session()
+
+# (connect, read) seconds; processing a candidate can take a while
+TIMEOUT = (3, 30)
+
 def test_api_health():
     """Test the health check endpoint"""
     try:
-        response = requests.get("http://localhost:8000/")
+        response = SESSION.get("http://localhost:8000/", timeout=TIMEOUT)
         print(f"✅ Health check: {response.status_code}")
         print(f"Response: {response.json()}")
         return True
@@ -34,23 +40,24 @@ def test_process_candidate():
     }
     
     try:
-        response = requests.post(
+        # stream=True defers the body download until we know we want it
+        with SESSION.post(
             "http://localhost:8000/api/process_candidate",
             json=test_data,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        print(f"✅ Process candidate: {response.status_code}")
-        
-        if response.status_code == 200:
+            timeout=TIMEOUT,
+            stream=True
+        ) as response:
+            print(f"✅ Process candidate: {response.status_code}")
+            
+            if response.status_code != 200:
+                print(f"Error: {response.status_code} {response.reason}")
+                return False
+            
             result = response.json()
             print(f"Status: {result.get('status')}")
             print(f"Summary: {result.get('summary_notes', 'No summary')}")
             print(f"Memories: {len(result.get('memories', []))} captured")
-        else:
-            print(f"Error: {response.text}")
-            
-        return response.status_code == 200
+            return True
         
     except Exception as e:
         print(f"❌ Process candidate failed: {e}")
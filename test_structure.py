@@ -2,8 +2,8 @@
 Test script to verify the system structure without requiring OpenAI API key
 """
 
-import json
 import sys
+import orjson
 from pathlib import Path
 
 def test_imports():
@@ -32,7 +32,7 @@ def test_default_profile():
                 return False
         
         print("✅ Default profile structure is correct")
-        print(f"Default profile: {json.dumps(profile, indent=2)}")
+        print(f"Default profile: {orjson.dumps(profile, option=orjson.OPT_INDENT_2).decode()}")
         return True
     except Exception as e:
         print(f"❌ Error testing default profile: {e}")
@@ -96,11 +96,89 @@ def test_interview_functions():
             print("❌ Chat formatting failed")
             return False
         
+        # Test truncated chat formatting matches slicing the full output
+        long_chat = {"chat_log": [{"role": "Anu", "message": "x" * 50}] * 40}
+        full = format_chat_for_display(long_chat)
+        if format_chat_for_display(long_chat, max_chars=800) == full[:800] + "..." and format_chat_for_display(default_data, max_chars=800) == formatted:
+            print("✅ Truncated chat formatting works correctly")
+        else:
+            print("❌ Truncated chat formatting failed")
+            return False
+        
         return True
     except Exception as e:
         print(f"❌ Error testing interview functions: {e}")
         return False
 
+def test_text_preparation():
+    """Test the PDF text cleanup applied before extraction."""
+    try:
+        from parse_documents import _prepare_text
+        
+        header = "Kinara Capital - Confidential"
+        
+        if _prepare_text("Jane Doe\nPage 1 of 3\n2 / 3\nSolidWorks\nPage 3", 1000) == "Jane Doe SolidWorks":
+            print("✅ Page-number lines are dropped")
+        else:
+            print("❌ Page-number lines were kept")
+            return False
+        
+        dice = "Drive (D)\n72\nInfluence (I)\n45\nGraduated\n2023\nPhone\n9876543210"
+        if _prepare_text(dice, 1000) == "Drive (D) 72 Influence (I) 45 Graduated 2023 Phone 9876543210":
+            print("✅ Bare numbers such as DICE scores are kept")
+        else:
+            print("❌ Bare numbers were dropped")
+            return False
+        
+        raw = "\n".join([header, "Jane Doe", header, "SolidWorks", header])
+        if _prepare_text(raw, 1000) == f"{header} Jane Doe SolidWorks":
+            print("✅ Repeated headers are deduplicated")
+        else:
+            print("❌ Repeated header deduplication failed")
+            return False
+        
+        if len(_prepare_text("word " * 1000, 100)) <= 100:
+            print("✅ Text is truncated to the character budget")
+        else:
+            print("❌ Text truncation failed")
+            return False
+        
+        return True
+    except Exception as e:
+        print(f"❌ Error testing text preparation: {e}")
+        return False
+
+def test_json_recovery():
+    """Test recovering profile JSON from non-bare model output."""
+    try:
+        from parse_documents import _robust_json_parse
+        
+        expected = {"name": "Test User", "skills": ["SolidWorks"]}
+        body = orjson.dumps(expected).decode()
+        
+        if _robust_json_parse(f"```json\n{body}\n```") == expected:
+            print("✅ Fenced JSON is recovered")
+        else:
+            print("❌ Fenced JSON recovery failed")
+            return False
+        
+        if _robust_json_parse(f"Here is the JSON: {body} Let me know!") == expected:
+            print("✅ Prefixed JSON is recovered")
+        else:
+            print("❌ Prefixed JSON recovery failed")
+            return False
+        
+        if _robust_json_parse('"name": "line\nbreak",') is None:
+            print("✅ Undecodable fields are skipped")
+        else:
+            print("❌ Undecodable field should be skipped")
+            return False
+        
+        return True
+    except Exception as e:
+        print(f"❌ Error testing JSON recovery: {e}")
+        return False
+
 def test_file_structure():
     """Test that all required files exist."""
     required_files = [
@@ -137,7 +215,9 @@ def main():
         ("Module Imports", test_imports),
         ("Default Profile", test_default_profile),
         ("Profile Validation", test_validation),
-        ("Interview Functions", test_interview_functions)
+        ("Interview Functions", test_interview_functions),
+        ("Text Preparation", test_text_preparation),
+        ("JSON Recovery", test_json_recovery)
     ]
     
     passed = 0
@@ -6,71 +6,149 @@ Run this to ensure your Supabase credentials are working correctly.
 """
 
 import os
-from dotenv import load_dotenv
-from supabase_insert import test_supabase_connection, get_supabase_client
+import uuid
+import logging
 
-# Load environment variables
-load_dotenv()
+# Load environment variables from .env unless the environment (e.g. a
+# container) already provides them
+if not (os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_KEY")):
+    from dotenv import load_dotenv
+    load_dotenv()
 
-def main():
-    """Test Supabase connection and basic operations."""
-    print("🧪 Testing Supabase Connection and Setup")
-    print("=" * 50)
+# Read once, after .env has been loaded
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+logger = logging.getLogger(__name__)
+
+# Large fields left out of the sample record structure
+_SKIP_FIELDS = frozenset({"chat_log", "answers"})
+
+def _check_bulk_insert(row_count: int = 10) -> bool:
+    """Insert a batch of dummy rows in one request, read them back with one IN query, then delete them."""
+    from supabase_insert import build_candidate_record, find_existing_emails, get_supabase_client, insert_candidates_bulk
+    
+    batch_id = uuid.uuid4().hex[:8]
+    emails = [f"bulk-test-{batch_id}-{i}@example.com" for i in range(row_count)]
+    records = [
+        build_candidate_record({"name": f"Bulk Test {i}", "email": email}, {}, cv_url="bulk-test", dice_url="bulk-test")
+        for i, email in enumerate(emails)
+    ]
+    
+    try:
+        inserted = insert_candidates_bulk(records)
+        logger.info("📥 Bulk insert: %d/%d rows", len(inserted), row_count)
+        
+        found = find_existing_emails(emails)
+        logger.info("🔎 Batched lookup: %d/%d rows found", len(found), row_count)
+        return len(inserted) == row_count and found == set(emails)
+    finally:
+        # Clean up the dummy rows with a single IN-filtered delete
+        supabase = get_supabase_client()
+        if supabase:
+            supabase.table("anu_interviews").delete().in_("email", emails).execute()
+            logger.info("🧹 Removed bulk test rows")
+
+def main(show_sample: bool = False, check_bulk: bool = False):
+    """
+    Test Supabase connection and basic operations.
+    
+    Args:
+        show_sample: Also fetch one row to print the column types
+        check_bulk: Also round-trip a batch of dummy rows through the bulk insert path
+    """
+    logger.info("🧪 Testing Supabase Connection and Setup")
+    logger.info("=" * 50)
     
     # Check environment variables
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
+    logger.info("🔗 Supabase URL: %s", SUPABASE_URL)
+    logger.info("🔑 Supabase Key: %s", f"{SUPABASE_KEY[:10]}...{SUPABASE_KEY[-4:]}" if SUPABASE_KEY else "NOT SET")
+    logger.info("")
     
-    print(f"🔗 Supabase URL: {supabase_url}")
-    print(f"🔑 Supabase Key: {supabase_key[:10]}...{supabase_key[-4:] if supabase_key else 'NOT SET'}")
-    print()
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        logger.error("❌ Missing Supabase credentials!")
+        logger.error("📝 Please set SUPABASE_URL and SUPABASE_KEY in your .env file")
+        return False
+    
+    # Imported only once there are credentials to test; pulls in the whole supabase client stack
+    from supabase_insert import check_supabase_credentials, get_engine, get_supabase_client, probe_anu_interviews
     
-    if not supabase_url or not supabase_key:
-        print("❌ Missing Supabase credentials!")
-        print("📝 Please set SUPABASE_URL and SUPABASE_KEY in your .env file")
+    # Catch malformed values locally instead of waiting on a TLS/connect timeout
+    problem = check_supabase_credentials(SUPABASE_URL, SUPABASE_KEY)
+    if problem:
+        logger.error("❌ Invalid Supabase credentials: %s", problem)
         return False
     
-    # Test connection
-    print("🔍 Testing connection...")
-    if test_supabase_connection():
-        print("✅ Connection successful!")
-        
-        # Test table structure
-        print("\n🔍 Testing table structure...")
+    # One HEAD request proves connectivity and table access, and returns the
+    # row count without transferring any rows
+    logger.info("🔍 Testing connection and table access...")
+    status, count = probe_anu_interviews()
+    
+    if status == "no_client":
+        logger.error("❌ Failed to get Supabase client")
+        return False
+    if status == "connection_failed":
+        logger.error("❌ Connection failed!")
+        return False
+    if status == "missing_table":
+        logger.error("❌ Connected, but table 'anu_interviews' does not exist")
+        return False
+    if status != "ok":
+        logger.error("❌ Connected, but Supabase rejected the query - check the key and table permissions")
+        return False
+    
+    logger.info("✅ Connection successful!")
+    logger.info("✅ Table 'anu_interviews' exists and is accessible!")
+    logger.info("📊 Current record count: %s", count)
+    
+    # Warm the SQLAlchemy pool when engine-style access is configured
+    engine = get_engine()
+    if engine is not None:
+        try:
+            engine.connect().close()
+            logger.info("✅ SQLAlchemy engine connected (SUPABASE_DB_URL)")
+        except Exception as e:
+            logger.error("❌ SQLAlchemy engine could not connect: %s", e)
+            return False
+    
+    if not count:
+        logger.info("📋 Table is empty - ready for first insertion!")
+    elif show_sample:
         try:
-            supabase = get_supabase_client()
-            if supabase:
-                # Try to get table info
-                result = supabase.table("anu_interviews").select("*").limit(1).execute()
-                print("✅ Table 'anu_interviews' exists and is accessible!")
-                print(f"📊 Current record count: {len(result.data)}")
-                
-                # Show table structure (first record if any)
-                if result.data:
-                    print("\n📋 Sample record structure:")
-                    sample = result.data[0]
-                    for key, value in sample.items():
-                        if key not in ['chat_log', 'answers']:  # Skip large fields
-                            print(f"   {key}: {type(value).__name__}")
-                else:
-                    print("📋 Table is empty - ready for first insertion!")
-                
-                return True
-            else:
-                print("❌ Failed to get Supabase client")
+            # Show table structure (first record)
+            sample_result = get_supabase_client().table("anu_interviews").select("*").limit(1).execute()
+            sample = sample_result.data[0]
+            structure = "\n".join(f"   {key}: {type(value).__name__}" for key, value in sample.items() if key not in _SKIP_FIELDS)
+            logger.info("\n📋 Sample record structure:\n%s", structure)
+        except Exception as e:
+            logger.error("❌ Error fetching sample record: %s", e)
+    
+    if check_bulk:
+        logger.info("\n🔍 Testing bulk insert path...")
+        try:
+            if not _check_bulk_insert():
+                logger.error("❌ Bulk insert check failed")
                 return False
-                
+            logger.info("✅ Bulk insert path works!")
         except Exception as e:
-            print(f"❌ Error testing table: {e}")
+            logger.error("❌ Error testing bulk insert: %s", e)
             return False
-    else:
-        print("❌ Connection failed!")
-        return False
+    
+    return True
 
 if __name__ == "__main__":
-    success = main()
+    import argparse
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
+    parser = argparse.ArgumentParser(description="Check Supabase connection and table setup")
+    parser.add_argument("--sample", action="store_true", help="Fetch one row to show the table's column types")
+    parser.add_argument("--bulk", action="store_true", help="Insert, look up and delete 10 dummy rows via the bulk path")
+    args = parser.parse_args()
+    
+    success = main(show_sample=args.sample, check_bulk=args.bulk)
     if success:
-        print("\n🎉 Supabase is ready for use!")
-        print("💡 You can now run main.py with --push-supabase flag")
+        logger.info("\n🎉 Supabase is ready for use!")
+        logger.info("💡 You can now run main.py with --push-supabase flag")
     else:
-        print("\n❌ Please fix the issues above before proceeding") 
\ No newline at end of file
+        logger.error("\n❌ Please fix the issues above before proceeding")